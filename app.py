@@ -1,29 +1,27 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
+from flask import Blueprint, Flask, current_app, render_template, request, redirect, url_for, flash, jsonify, send_file, abort
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_socketio import SocketIO, emit, join_room, leave_room
 from werkzeug.utils import secure_filename
-from datetime import datetime, timedelta, date
+from datetime import datetime, timedelta, date, timezone
 import os
+import click
 
 from config import Config
-from models import db, User, Livro, RegistroLeitura, SessaoLeitura, Mensagem, MensagemPrivada
-from utils import save_upload_image, buscar_livros_google
-
-app = Flask(__name__)
-app.config.from_object(Config)
-
-# Inicializar extensões
-db.init_app(app)
-socketio = SocketIO(
-    app,
-    async_mode=app.config['SOCKETIO_ASYNC_MODE'],
-    cors_allowed_origins="*",
-    manage_session=False
-)
+from models import db, atualizar_esquema, User, Livro, LivroCatalogo, RegistroLeitura, SessaoLeitura, Mensagem, MensagemPrivada
+from utils import save_upload_image, resposta_json
+from catalogo import buscar_livros, obter_entrada_catalogo
+from covers import host_permitido, obter_cover
+from transmissao import AgendadorTransmissao, LimitadorMensagens
+from arquivo import arquivar_mensagens, mensagens_anteriores, mensagens_privadas_anteriores
+
+# Extensões sem app; são ligadas à aplicação em create_app()
+bp = Blueprint('main', __name__, cli_group=None)
+socketio = SocketIO()
+agendador = AgendadorTransmissao(socketio)
+limitador = LimitadorMensagens()
 
 login_manager = LoginManager()
-login_manager.init_app(app)
-login_manager.login_view = 'login'
+login_manager.login_view = 'main.login'
 
 
 @login_manager.user_loader
@@ -31,20 +29,16 @@ def load_user(user_id):
     return User.query.get(int(user_id))
 
 
-# Criar diretórios necessários
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
-
 # ============= ROTAS DE AUTENTICAÇÃO =============
 
-@app.route('/')
+@bp.route('/')
 def index():
     if current_user.is_authenticated:
-        return redirect(url_for('dashboard'))
-    return redirect(url_for('login'))
+        return redirect(url_for('main.dashboard'))
+    return redirect(url_for('main.login'))
 
 
-@app.route('/register', methods=['GET', 'POST'])
+@bp.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
         username = request.form.get('username')
@@ -55,11 +49,11 @@ def register():
         # Validações
         if User.query.filter_by(email=email).first():
             flash('Email já cadastrado!', 'error')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
 
         if User.query.filter_by(username=username).first():
             flash('Nome de usuário já existe!', 'error')
-            return redirect(url_for('register'))
+            return redirect(url_for('main.register'))
 
         user = User(username=username, email=email, nome_completo=nome_completo)
         user.set_password(password)
@@ -68,12 +62,12 @@ def register():
         db.session.commit()
 
         flash('Conta criada com sucesso!', 'success')
-        return redirect(url_for('login'))
+        return redirect(url_for('main.login'))
 
     return render_template('login.html', action='register')
 
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         email = request.form.get('email')
@@ -85,26 +79,26 @@ def login():
             login_user(user, remember=True)
             user.last_login = datetime.utcnow()
             db.session.commit()
-            return redirect(url_for('dashboard'))
+            return redirect(url_for('main.dashboard'))
 
         flash('Email ou senha incorretos!', 'error')
 
     return render_template('login.html', action='login')
 
 
-@app.route('/logout')
+@bp.route('/logout')
 @login_required
 def logout():
     logout_user()
-    return redirect(url_for('login'))
+    return redirect(url_for('main.login'))
 
 
 # ============= ROTAS PRINCIPAIS =============
 
-@app.route('/dashboard')
+@bp.route('/dashboard')
 @login_required
 def dashboard():
-    livros = current_user.livros.order_by(Livro.created_at.desc()).all()
+    livros = current_user.livros.options(db.joinedload(Livro.catalogo)).order_by(Livro.created_at.desc()).all()
 
     # Estatísticas
     stats = {
@@ -116,7 +110,7 @@ def dashboard():
     return render_template('dashboard.html', livros=livros, stats=stats)
 
 
-@app.route('/perfil', methods=['GET', 'POST'])
+@bp.route('/perfil', methods=['GET', 'POST'])
 @login_required
 def perfil():
     if request.method == 'POST':
@@ -141,25 +135,25 @@ def perfil():
 
         db.session.commit()
         flash('Perfil atualizado!', 'success')
-        return redirect(url_for('perfil'))
+        return redirect(url_for('main.perfil'))
 
     return render_template('perfil.html')
 
 
 # ============= API DE LIVROS =============
 
-@app.route('/api/buscar-livros')
+@bp.route('/api/buscar-livros')
 @login_required
 def api_buscar_livros():
     query = request.args.get('q', '')
     if not query:
         return jsonify([])
 
-    livros = buscar_livros_google(query)
+    livros = buscar_livros(query)
     return jsonify(livros)
 
 
-@app.route('/api/adicionar-livro', methods=['POST'])
+@bp.route('/api/adicionar-livro', methods=['POST'])
 @login_required
 def api_adicionar_livro():
     data = request.json or {}
@@ -175,6 +169,8 @@ def api_adicionar_livro():
     if total_paginas <= 0:
         return jsonify({'error': 'Número de páginas deve ser maior que zero'}), 400
 
+    entrada = obter_entrada_catalogo(data.get('google_id'))
+
     livro = Livro(
         titulo=titulo,
         autor=data.get('autor', ''),
@@ -182,6 +178,7 @@ def api_adicionar_livro():
         total_paginas=total_paginas,
         capa_url=data.get('capa_url', ''),
         google_books_id=data.get('google_id'),
+        catalogo_id=entrada.id if entrada else None,
         usuario_id=current_user.id,
         iniciado_em=datetime.utcnow()
     )
@@ -192,7 +189,30 @@ def api_adicionar_livro():
     return jsonify({'success': True, 'livro_id': livro.id})
 
 
-@app.route('/api/registrar-leitura', methods=['POST'])
+# ============= CAPAS =============
+
+@bp.route('/covers/<int:catalogo_id>')
+@login_required
+def cover(catalogo_id):
+    entrada = LivroCatalogo.query.get_or_404(catalogo_id)
+    if not entrada.capa_url:
+        abort(404)
+
+    tamanho = request.args.get('tamanho', 'm')
+    if tamanho not in current_app.config['COVER_TAMANHOS']:
+        return jsonify({'error': 'Tamanho inválido'}), 400
+
+    caminho = obter_cover(entrada, tamanho)
+    if caminho is None:
+        # Falha ao baixar/processar: usa a imagem original, apenas de hosts conhecidos
+        if host_permitido(entrada.capa_url):
+            return redirect(entrada.capa_url)
+        abort(404)
+
+    return send_file(caminho, mimetype='image/webp', max_age=current_app.config['COVER_CACHE_MAX_AGE'])
+
+
+@bp.route('/api/registrar-leitura', methods=['POST'])
 @login_required
 def api_registrar_leitura():
     data = request.json or {}
@@ -254,7 +274,7 @@ def api_registrar_leitura():
 
 # ============= CRONÔMETRO E SESSÕES =============
 
-@app.route('/api/iniciar-sessao', methods=['POST'])
+@bp.route('/api/iniciar-sessao', methods=['POST'])
 @login_required
 def api_iniciar_sessao():
     data = request.json or {}
@@ -280,7 +300,7 @@ def api_iniciar_sessao():
     return jsonify({'success': True, 'sessao_id': sessao.id})
 
 
-@app.route('/api/finalizar-sessao', methods=['POST'])
+@bp.route('/api/finalizar-sessao', methods=['POST'])
 @login_required
 def api_finalizar_sessao():
     data = request.json
@@ -323,7 +343,7 @@ def api_finalizar_sessao():
     return jsonify({'success': True, 'duracao_minutos': sessao.duracao_minutos})
 
 
-@app.route('/api/historico-sessoes/<int:livro_id>')
+@bp.route('/api/historico-sessoes/<int:livro_id>')
 @login_required
 def api_historico_sessoes(livro_id):
     livro = Livro.query.get_or_404(livro_id)
@@ -331,43 +351,128 @@ def api_historico_sessoes(livro_id):
     if livro.usuario_id != current_user.id:
         return jsonify({'error': 'Não autorizado'}), 403
 
+    try:
+        limite = int(request.args.get('limite', current_app.config['HISTORICO_LIMITE_PADRAO']))
+        cursor = request.args.get('cursor')
+        cursor = int(cursor) if cursor is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'error': 'limite ou cursor inválido'}), 400
+    limite = max(1, min(limite, current_app.config['HISTORICO_LIMITE_MAXIMO']))
+
+    # Colunas em tuplas (sem instanciar objetos ORM), da sessão mais recente para a mais antiga
+    consulta = db.session.query(
+        SessaoLeitura.id,
+        SessaoLeitura.inicio,
+        SessaoLeitura.duracao_minutos,
+        SessaoLeitura.pagina_inicial,
+        SessaoLeitura.pagina_final
+    ).filter(
+        SessaoLeitura.livro_id == livro.id,
+        SessaoLeitura.fim.isnot(None)
+    )
+    if cursor:
+        consulta = consulta.filter(SessaoLeitura.id < cursor)
+    linhas = consulta.order_by(SessaoLeitura.id.desc()).limit(limite + 1).all()
+
+    proximo_cursor = linhas[limite - 1][0] if len(linhas) > limite else None
+    linhas = linhas[:limite]
+
+    if request.args.get('formato') == 'colunas':
+        ids, inicios, duracoes, iniciais, finais, lidas = [], [], [], [], [], []
+        for id_, inicio, duracao, pagina_inicial, pagina_final in linhas:
+            ids.append(id_)
+            inicios.append(int(inicio.replace(tzinfo=timezone.utc).timestamp()))
+            duracoes.append(duracao)
+            iniciais.append(pagina_inicial)
+            finais.append(pagina_final)
+            lidas.append(SessaoLeitura.calcular_paginas_lidas(pagina_inicial, pagina_final))
+
+        return resposta_json({
+            'colunas': {
+                'id': ids,
+                'inicio': inicios,
+                'duracao_minutos': duracoes,
+                'pagina_inicial': iniciais,
+                'pagina_final': finais,
+                'paginas_lidas': lidas
+            },
+            'proximo_cursor': proximo_cursor
+        })
+
     sessoes = [{
-        'id': s.id,
-        'inicio': s.inicio.strftime('%d/%m/%Y %H:%M'),
-        'duracao_minutos': s.duracao_minutos,
-        'paginas_lidas': s.paginas_lidas,
-        'pagina_inicial': s.pagina_inicial,
-        'pagina_final': s.pagina_final
-    } for s in livro.sessoes.filter(SessaoLeitura.fim.isnot(None)).all()]
+        'id': id_,
+        'inicio': inicio.strftime('%d/%m/%Y %H:%M'),
+        'duracao_minutos': duracao,
+        'paginas_lidas': SessaoLeitura.calcular_paginas_lidas(pagina_inicial, pagina_final),
+        'pagina_inicial': pagina_inicial,
+        'pagina_final': pagina_final
+    } for id_, inicio, duracao, pagina_inicial, pagina_final in linhas]
 
-    return jsonify(sessoes)
+    return resposta_json({'sessoes': sessoes, 'proximo_cursor': proximo_cursor})
 
 
 # ============= CHAT EM TEMPO REAL COM SOCKETIO =============
 
-@app.route('/chat')
+@bp.route('/chat')
 @login_required
 def chat():
     usuarios = User.query.filter(User.id != current_user.id).all()
-    mensagens_recentes = Mensagem.query.order_by(Mensagem.timestamp.desc()).limit(50).all()
-    mensagens_recentes.reverse()
+    mensagens_recentes, _ = mensagens_anteriores(limite=50)
 
     return render_template('chat.html', usuarios=usuarios, mensagens=mensagens_recentes)
 
 
+@bp.route('/api/mensagens')
+@login_required
+def api_mensagens():
+    antes = request.args.get('antes', type=int)
+    limite = max(1, min(request.args.get('limite', 50, type=int), 200))
+
+    mensagens, proximo_cursor = mensagens_anteriores(antes, limite)
+    return jsonify({'mensagens': [m.to_dict() for m in mensagens], 'proximo_cursor': proximo_cursor})
+
+
+@bp.route('/api/mensagens-privadas/<int:usuario_id>')
+@login_required
+def api_mensagens_privadas(usuario_id):
+    antes = request.args.get('antes', type=int)
+    limite = max(1, min(request.args.get('limite', 50, type=int), 200))
+
+    mensagens, proximo_cursor = mensagens_privadas_anteriores(current_user.id, usuario_id, antes, limite)
+    return jsonify({'mensagens': [m.to_dict() for m in mensagens], 'proximo_cursor': proximo_cursor})
+
+
+@bp.route('/api/chat/estatisticas')
+@login_required
+def api_chat_estatisticas():
+    return jsonify(agendador.estatisticas())
+
+
 @socketio.on('connect')
 def handle_connect():
     if current_user.is_authenticated:
-        emit('usuario_conectado', {
+        agendador.enfileirar('usuario_conectado', {
             'usuario': current_user.username,
             'foto_perfil': current_user.foto_perfil
-        }, broadcast=True)
+        })
+
+
+def _limite_excedido(data):
+    if limitador.permitir(current_user.id):
+        return False
+    agendador.registrar_limitado()
+    # cliente_id identifica no navegador a mensagem exibida antes da confirmação
+    emit('erro', {'error': 'Muitas mensagens. Aguarde um momento.',
+                  'cliente_id': (data or {}).get('cliente_id')})
+    return True
 
 
 @socketio.on('enviar_mensagem')
 def handle_mensagem(data):
     if not current_user.is_authenticated:
         return
+    if _limite_excedido(data):
+        return
 
     mensagem = Mensagem(
         usuario_id=current_user.id,
@@ -377,7 +482,7 @@ def handle_mensagem(data):
     db.session.add(mensagem)
     db.session.commit()
 
-    emit('nova_mensagem', mensagem.to_dict(), broadcast=True)
+    agendador.enfileirar('nova_mensagem', mensagem.to_dict())
 
 
 @socketio.on('entrar_chat_privado')
@@ -385,13 +490,8 @@ def handle_entrar_chat_privado(data):
     room = f"chat_{min(current_user.id, data['usuario_id'])}_{max(current_user.id, data['usuario_id'])}"
     join_room(room)
 
-    # Carregar mensagens anteriores
-    mensagens = MensagemPrivada.query.filter(
-        ((MensagemPrivada.remetente_id == current_user.id) &
-         (MensagemPrivada.destinatario_id == data['usuario_id'])) |
-        ((MensagemPrivada.remetente_id == data['usuario_id']) &
-         (MensagemPrivada.destinatario_id == current_user.id))
-    ).order_by(MensagemPrivada.timestamp).limit(50).all()
+    # Carregar mensagens anteriores (as mais antigas via /api/mensagens-privadas)
+    mensagens, _ = mensagens_privadas_anteriores(current_user.id, data['usuario_id'], limite=50)
 
     emit('historico_mensagens', [m.to_dict() for m in mensagens])
 
@@ -400,6 +500,8 @@ def handle_entrar_chat_privado(data):
 def handle_mensagem_privada(data):
     if not current_user.is_authenticated:
         return
+    if _limite_excedido(data):
+        return
 
     mensagem = MensagemPrivada(
         remetente_id=current_user.id,
@@ -411,21 +513,56 @@ def handle_mensagem_privada(data):
     db.session.commit()
 
     room = f"chat_{min(current_user.id, data['destinatario_id'])}_{max(current_user.id, data['destinatario_id'])}"
-    emit('nova_mensagem_privada', mensagem.to_dict(), room=room)
+    agendador.enfileirar('nova_mensagem_privada', mensagem.to_dict(), room=room)
 
 
 # ============= INICIALIZAÇÃO =============
 
-@app.cli.command()
+@bp.cli.command()
 def init_db():
-    """Inicializa o banco de dados"""
-    db.create_all()
+    """Inicializa o banco de dados ou atualiza o esquema de um banco existente"""
+    atualizar_esquema()
     print("Banco de dados criado!")
 
 
+@bp.cli.command('arquivar-mensagens')
+@click.option('--dias', type=int, default=None, help='Idade mínima das mensagens, em dias')
+@click.option('--lote', type=int, default=None, help='Mensagens movidas por transação')
+def arquivar_mensagens_command(dias, lote):
+    """Move mensagens antigas do chat para as tabelas de arquivo"""
+    dias = dias if dias is not None else current_app.config['ARQUIVO_MENSAGENS_DIAS']
+    lote = lote or current_app.config['ARQUIVO_LOTE']
+
+    movidas = arquivar_mensagens(dias, lote)
+    for tabela, total in movidas.items():
+        print(f"{tabela}: {total} mensagens arquivadas")
+
+
+def create_app(config_class=Config):
+    """Cria e configura a aplicação; nada é inicializado na importação do módulo"""
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+
+    # Inicializar extensões
+    db.init_app(app)
+    socketio.init_app(
+        app,
+        async_mode=app.config['SOCKETIO_ASYNC_MODE'],
+        cors_allowed_origins="*",
+        manage_session=False
+    )
+    agendador.init_app(app)
+    limitador.init_app(app)
+    login_manager.init_app(app)
+
+    app.register_blueprint(bp)
+    return app
+
+
 if __name__ == '__main__':
+    app = create_app()
     with app.app_context():
-        db.create_all()
+        atualizar_esquema()
     
     # Para desenvolvimento local
     if os.environ.get('FLASK_ENV') != 'production':
@@ -0,0 +1,98 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, true
+
+from models import db, Mensagem, MensagemArquivada, MensagemPrivada, MensagemPrivadaArquivada
+
+# Tabela quente -> tabela de arquivo (mesmas colunas e ids, conteúdo sem compressão)
+TABELAS_ARQUIVO = (
+    (Mensagem, MensagemArquivada),
+    (MensagemPrivada, MensagemPrivadaArquivada),
+)
+
+
+def _mover_lote(modelo, arquivo, limite_data, lote):
+    """Move até `lote` mensagens anteriores a `limite_data` em uma única transação curta
+
+    A mensagem de maior id nunca é arquivada. Em tabelas SQLite criadas sem
+    AUTOINCREMENT o próximo id é max(id) + 1, então manter essa linha garante
+    que novas mensagens recebam ids maiores que todos os arquivados.
+    """
+    maior_id = db.session.query(func.max(modelo.id)).scalar()
+    if maior_id is None:
+        return 0
+
+    ids = [id_ for id_, in db.session.query(modelo.id)
+           .filter(modelo.timestamp < limite_data, modelo.id < maior_id)
+           .order_by(modelo.id)
+           .limit(lote)]
+    if not ids:
+        return 0
+
+    colunas = [c.name for c in arquivo.__table__.columns]
+    origem = select(*[modelo.__table__.c[nome] for nome in colunas]).where(modelo.id.in_(ids))
+
+    try:
+        db.session.execute(arquivo.__table__.insert().from_select(colunas, origem))
+        db.session.execute(modelo.__table__.delete().where(modelo.id.in_(ids)))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(ids)
+
+
+def arquivar_mensagens(dias, lote=1000):
+    """Move as mensagens com mais de `dias` dias para as tabelas de arquivo
+
+    Cada lote é copiado e removido na mesma transação, então o comando pode
+    rodar com a aplicação no ar e ser interrompido a qualquer momento.
+    """
+    limite_data = datetime.utcnow() - timedelta(days=dias)
+    movidas = {}
+    for modelo, arquivo in TABELAS_ARQUIVO:
+        total = 0
+        while True:
+            n = _mover_lote(modelo, arquivo, limite_data, lote)
+            total += n
+            if n < lote:
+                break
+        movidas[modelo.__tablename__] = total
+    return movidas
+
+
+def _paginar(modelo, arquivo, filtro, antes, limite):
+    """Busca mensagens com id < `antes`, completando no arquivo quando a tabela quente acaba
+
+    Os ids arquivados são sempre menores que os da tabela quente, pois o
+    arquivamento move as mensagens mais antigas primeiro.
+    """
+    consulta = modelo.query.filter(filtro(modelo))
+    if antes:
+        consulta = consulta.filter(modelo.id < antes)
+    mensagens = consulta.order_by(modelo.id.desc()).limit(limite).all()
+
+    if len(mensagens) < limite:
+        antes_arquivo = mensagens[-1].id if mensagens else antes
+        consulta = arquivo.query.filter(filtro(arquivo))
+        if antes_arquivo:
+            consulta = consulta.filter(arquivo.id < antes_arquivo)
+        mensagens += consulta.order_by(arquivo.id.desc()).limit(limite - len(mensagens)).all()
+
+    mensagens.reverse()
+    proximo_cursor = mensagens[0].id if len(mensagens) == limite else None
+    return mensagens, proximo_cursor
+
+
+def mensagens_anteriores(antes=None, limite=50):
+    """Mensagens do chat geral em ordem cronológica, paginadas por id"""
+    return _paginar(Mensagem, MensagemArquivada, lambda m: true(), antes, limite)
+
+
+def mensagens_privadas_anteriores(usuario_id, outro_id, antes=None, limite=50):
+    """Mensagens de uma conversa privada em ordem cronológica, paginadas por id"""
+    def conversa(m):
+        return (((m.remetente_id == usuario_id) & (m.destinatario_id == outro_id)) |
+                ((m.remetente_id == outro_id) & (m.destinatario_id == usuario_id)))
+
+    return _paginar(MensagemPrivada, MensagemPrivadaArquivada, conversa, antes, limite)
@@ -0,0 +1,106 @@
+"""Compara o histórico de sessões antigo (lista completa de objetos ORM) com o paginado/colunar
+
+Cria um banco SQLite temporário com um livro e N sessões finalizadas.
+
+    python benchmarks/bench_historico.py --sessoes 50000 --limite 500
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask import jsonify  # noqa: E402
+
+from app import create_app  # noqa: E402
+from config import Config  # noqa: E402
+from models import db, User, Livro, SessaoLeitura  # noqa: E402
+
+
+def historico_antigo(livro):
+    """Caminho anterior: todas as sessões como objetos ORM, strftime por linha, jsonify"""
+    return jsonify([{
+        'id': s.id,
+        'inicio': s.inicio.strftime('%d/%m/%Y %H:%M'),
+        'duracao_minutos': s.duracao_minutos,
+        'paginas_lidas': s.paginas_lidas,
+        'pagina_inicial': s.pagina_inicial,
+        'pagina_final': s.pagina_final
+    } for s in livro.sessoes.filter(SessaoLeitura.fim.isnot(None)).all()])
+
+
+def popular(n_sessoes):
+    user = User(username='bench', email='bench@example.com')
+    user.set_password('bench')
+    db.session.add(user)
+    db.session.commit()
+    livro = Livro(titulo='Bench', total_paginas=100000, usuario_id=user.id)
+    db.session.add(livro)
+    db.session.commit()
+
+    inicio = datetime(2020, 1, 1)
+    db.session.execute(SessaoLeitura.__table__.insert(), [{
+        'livro_id': livro.id, 'usuario_id': user.id,
+        'inicio': inicio + timedelta(hours=i), 'fim': inicio + timedelta(hours=i, minutes=30),
+        'duracao_minutos': 30, 'pagina_inicial': 1, 'pagina_final': 20
+    } for i in range(n_sessoes)])
+    db.session.commit()
+    return livro.id
+
+
+def medir(nome, funcao, repeticoes=3):
+    melhor, tamanho = None, 0
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        tamanho = funcao()
+        decorrido = time.perf_counter() - inicio
+        melhor = decorrido if melhor is None else min(melhor, decorrido)
+    print(f'{nome:32s} {melhor * 1000:9.1f} ms  {tamanho:>10} bytes')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sessoes', type=int, default=50000)
+    parser.add_argument('--limite', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as pasta:
+        class BenchConfig(Config):
+            SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(pasta, 'bench.db')
+            HISTORICO_LIMITE_MAXIMO = max(args.limite, Config.HISTORICO_LIMITE_MAXIMO)
+
+        app = create_app(BenchConfig)
+        with app.app_context():
+            db.create_all()
+            livro_id = popular(args.sessoes)
+
+            client = app.test_client()
+            client.post('/login', data={'email': 'bench@example.com', 'password': 'bench'})
+            url = f'/api/historico-sessoes/{livro_id}?limite={args.limite}'
+
+            def antigo():
+                with app.test_request_context():
+                    return len(historico_antigo(db.session.get(Livro, livro_id)).data)
+
+            def todas_as_paginas():
+                cursor, total = None, 0
+                while True:
+                    r = client.get(url + '&formato=colunas' + (f'&cursor={cursor}' if cursor else ''))
+                    total += len(r.data)
+                    cursor = r.json['proximo_cursor']
+                    if not cursor:
+                        return total
+
+            print(f'{args.sessoes} sessões, páginas de {args.limite}')
+            medir('antigo (lista completa)', antigo)
+            medir('novo, 1 página (lista)', lambda: len(client.get(url).data))
+            medir('novo, 1 página (colunas)', lambda: len(client.get(url + '&formato=colunas').data))
+            medir('novo, todas as páginas (colunas)', todas_as_paginas, repeticoes=1)
+            db.session.remove()
+
+
+if __name__ == '__main__':
+    main()
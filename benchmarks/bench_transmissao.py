@@ -0,0 +1,107 @@
+"""Compara o envio direto por mensagem com o envio em lotes do AgendadorTransmissao
+
+Simula milhares de sockets locais: cada emit serializa o pacote uma vez e o
+entrega a todos os sockets da sala, como o servidor Socket.IO faz.
+
+    python benchmarks/bench_transmissao.py --sockets 3000 --mensagens 2000
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from transmissao import AgendadorTransmissao, LimitadorMensagens  # noqa: E402
+
+MENSAGEM = {'id': 1, 'usuario': 'leitor', 'usuario_id': 1, 'foto_perfil': 'default.jpg',
+            'conteudo': 'Terminei o capítulo 3!', 'timestamp': '10:00'}
+
+
+class SocketSimulado:
+    __slots__ = ('pacotes', 'bytes')
+
+    def __init__(self):
+        self.pacotes = 0
+        self.bytes = 0
+
+    def enviar(self, pacote):
+        self.pacotes += 1
+        self.bytes += len(pacote)
+
+
+class SocketIOSimulado:
+    def __init__(self, n_sockets):
+        self.sockets = [SocketSimulado() for _ in range(n_sockets)]
+
+    def emit(self, evento, dados, to=None):
+        pacote = json.dumps([evento, dados]).encode()
+        for socket in self.sockets:
+            socket.enviar(pacote)
+
+    def start_background_task(self, alvo):
+        thread = threading.Thread(target=alvo, daemon=True)
+        thread.start()
+        return thread
+
+    def sleep(self, segundos):
+        time.sleep(segundos)
+
+    def totais(self):
+        return (sum(s.pacotes for s in self.sockets), sum(s.bytes for s in self.sockets))
+
+
+def bench_direto(n_sockets, n_mensagens, taxa):
+    socketio = SocketIOSimulado(n_sockets)
+    inicio = time.perf_counter()
+    for _ in range(n_mensagens):
+        socketio.emit('nova_mensagem', MENSAGEM)
+        time.sleep(1 / taxa)
+    return time.perf_counter() - inicio, socketio.totais(), None
+
+
+def bench_lotes(n_sockets, n_mensagens, taxa, intervalo):
+    socketio = SocketIOSimulado(n_sockets)
+    agendador = AgendadorTransmissao(socketio, intervalo=intervalo)
+    inicio = time.perf_counter()
+    for _ in range(n_mensagens):
+        agendador.enfileirar('nova_mensagem', MENSAGEM)
+        time.sleep(1 / taxa)
+    while agendador.estatisticas()['pendentes']:
+        time.sleep(intervalo)
+    time.sleep(intervalo)
+    return time.perf_counter() - inicio, socketio.totais(), agendador.estatisticas()
+
+
+def bench_flood(n_mensagens):
+    limitador = LimitadorMensagens(capacidade=5, taxa=1)
+    inicio = time.perf_counter()
+    aceitas = sum(limitador.permitir(1) for _ in range(n_mensagens))
+    return time.perf_counter() - inicio, aceitas
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sockets', type=int, default=3000)
+    parser.add_argument('--mensagens', type=int, default=2000)
+    parser.add_argument('--taxa', type=float, default=1000, help='mensagens recebidas por segundo')
+    parser.add_argument('--intervalo', type=float, default=0.05, help='segundos entre lotes')
+    args = parser.parse_args()
+
+    print(f'{args.sockets} sockets, {args.mensagens} mensagens a {args.taxa:.0f}/s')
+    for nome, (tempo, (pacotes, total_bytes), stats) in (
+        ('direto', bench_direto(args.sockets, args.mensagens, args.taxa)),
+        ('lotes', bench_lotes(args.sockets, args.mensagens, args.taxa, args.intervalo)),
+    ):
+        print(f'{nome:7s} {tempo:6.2f}s  {pacotes:>10} pacotes  {total_bytes / 1e6:8.1f} MB')
+        if stats:
+            print(f'        {stats}')
+
+    tempo, aceitas = bench_flood(100000)
+    print(f'flood   {tempo:6.2f}s  100000 mensagens de um usuário, {aceitas} aceitas')
+
+
+if __name__ == '__main__':
+    main()
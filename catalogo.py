@@ -0,0 +1,190 @@
+import re
+import threading
+import unicodedata
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy.exc import IntegrityError
+
+from models import db, LivroCatalogo, CatalogoTermo
+from utils import buscar_livros_google, buscar_volume_google
+
+# Ids do catálogo com atualização em segundo plano já agendada
+_em_atualizacao = set()
+_em_atualizacao_lock = threading.Lock()
+
+
+def normalizar_texto(texto):
+    """Remove acentos e converte para minúsculas"""
+    texto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in texto if not unicodedata.combining(c)).lower()
+
+
+def extrair_termos(*textos):
+    """Quebra os textos em palavras normalizadas usadas pelo índice de prefixos"""
+    termos = set()
+    for texto in textos:
+        for palavra in re.findall(r'\w+', normalizar_texto(texto)):
+            if len(palavra) >= 2:
+                termos.add(palavra[:100])
+    return termos
+
+
+def _indexar(entrada):
+    """Recria as linhas do índice de prefixos de uma entrada do catálogo"""
+    entrada.termos.delete()
+    for termo in extrair_termos(entrada.titulo, entrada.autor, entrada.isbn):
+        db.session.add(CatalogoTermo(termo=termo, catalogo=entrada))
+
+
+def _texto(valor, tamanho=None):
+    """Converte um campo para str, descartando tipos inesperados"""
+    if not isinstance(valor, str):
+        return ''
+    return valor[:tamanho] if tamanho else valor
+
+
+def _atualizar_entrada(entrada, dados):
+    entrada.titulo = _texto(dados.get('titulo'), 300) or 'Sem título'
+    entrada.autor = _texto(dados.get('autor'), 200)
+    entrada.isbn = _texto(dados.get('isbn'), 20) or entrada.isbn
+    paginas = dados.get('paginas')
+    if isinstance(paginas, int) and paginas > 0:
+        entrada.total_paginas = paginas
+    entrada.total_paginas = entrada.total_paginas or 0
+    entrada.capa_url = _texto(dados.get('capa_url'), 500) or entrada.capa_url
+    entrada.descricao = _texto(dados.get('descricao')) or entrada.descricao
+    entrada.atualizado_em = datetime.utcnow()
+
+
+def _localizar_entrada(google_id):
+    # Uma entrada por volume: o Google costuma ter vários ids para o mesmo ISBN
+    return LivroCatalogo.query.filter_by(google_books_id=google_id).first()
+
+
+def salvar_no_catalogo(resultados):
+    """Insere ou atualiza no catálogo os livros vindos do Google Books"""
+    for tentativa in range(2):
+        try:
+            _salvar_resultados(resultados)
+            db.session.commit()
+            return
+        except IntegrityError:
+            # Outra requisição inseriu o mesmo google_books_id ao mesmo tempo;
+            # na segunda tentativa a entrada já existe e é apenas atualizada
+            db.session.rollback()
+    print("Erro ao salvar no catálogo: conflito de google_books_id")
+
+
+def _salvar_resultados(resultados):
+    vistos = set()
+    for dados in resultados:
+        google_id = _texto(dados.get('google_id'), 100)
+        if not google_id or google_id in vistos:
+            continue
+        vistos.add(google_id)
+
+        entrada = _localizar_entrada(google_id)
+        if entrada is None:
+            entrada = LivroCatalogo(google_books_id=google_id)
+            db.session.add(entrada)
+
+        _atualizar_entrada(entrada, dados)
+        db.session.flush()
+        _indexar(entrada)
+
+
+def obter_entrada_catalogo(google_id):
+    """Retorna a entrada do catálogo para um google_id, consultando o Google se ainda não existir
+
+    O catálogo é compartilhado entre usuários, então só é preenchido com
+    dados vindos do Google Books, nunca com o corpo da requisição.
+    """
+    if not google_id or not isinstance(google_id, str):
+        return None
+
+    entrada = _localizar_entrada(google_id)
+    if entrada is None:
+        dados = buscar_volume_google(google_id)
+        if not dados or dados.get('google_id') != google_id:
+            return None
+        salvar_no_catalogo([dados])
+        entrada = _localizar_entrada(google_id)
+    return entrada
+
+
+def buscar_no_catalogo(query, limite=20):
+    """Busca no catálogo local: cada palavra da consulta deve ser prefixo de um termo indexado"""
+    termos = extrair_termos(query)
+    if not termos:
+        return []
+
+    consulta = LivroCatalogo.query
+    for termo in termos:
+        # LIKE 'termo%' (com _ e % escapados); não depende da ordenação da collation
+        ids = db.session.query(CatalogoTermo.catalogo_id).filter(
+            CatalogoTermo.termo.startswith(termo, autoescape=True)
+        )
+        consulta = consulta.filter(LivroCatalogo.id.in_(ids))
+
+    return consulta.order_by(LivroCatalogo.titulo).limit(limite).all()
+
+
+def _atualizar_em_segundo_plano(app, ids):
+    with app.app_context():
+        try:
+            for entrada in LivroCatalogo.query.filter(LivroCatalogo.id.in_(ids)).all():
+                dados = buscar_volume_google(entrada.google_books_id)
+                if dados:
+                    _atualizar_entrada(entrada, dados)
+                    _indexar(entrada)
+                else:
+                    # Evita novas tentativas imediatas quando o Google falhar
+                    entrada.atualizado_em = datetime.utcnow()
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Erro ao atualizar catálogo: {e}")
+        finally:
+            with _em_atualizacao_lock:
+                _em_atualizacao.difference_update(ids)
+
+
+def agendar_atualizacao(entradas):
+    """Agenda a atualização das entradas vencidas sem bloquear a requisição"""
+    limite = datetime.utcnow() - current_app.config['CATALOGO_TTL']
+    vencidas = [e.id for e in entradas
+                if e.google_books_id and e.atualizado_em and e.atualizado_em < limite]
+
+    with _em_atualizacao_lock:
+        ids = [i for i in vencidas if i not in _em_atualizacao]
+        _em_atualizacao.update(ids)
+    if not ids:
+        return
+
+    thread = threading.Thread(
+        target=_atualizar_em_segundo_plano,
+        args=(current_app._get_current_object(), ids),
+        daemon=True
+    )
+    thread.start()
+
+
+def buscar_livros(query, limite=20):
+    """Busca livros no catálogo local e só consulta o Google Books quando faltam resultados"""
+    entradas = buscar_no_catalogo(query, limite)
+    livros = [e.to_dict() for e in entradas]
+
+    if len(livros) >= current_app.config['CATALOGO_MIN_RESULTADOS']:
+        agendar_atualizacao(entradas)
+        return livros
+
+    externos = buscar_livros_google(query)
+    if not externos:
+        return livros
+
+    salvar_no_catalogo(externos)
+
+    ids_locais = {livro['google_id'] for livro in livros}
+    livros.extend(livro for livro in externos if livro['google_id'] not in ids_locais)
+    return livros[:limite]
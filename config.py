@@ -23,10 +23,31 @@ class Config:
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
     ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 
+    # Cache local de capas
+    COVER_CACHE_FOLDER = os.environ.get('COVER_CACHE_FOLDER') or os.path.join(BASE_DIR, 'cache/covers')
+    COVER_CACHE_MAX_BYTES = int(os.environ.get('COVER_CACHE_MAX_MB', 200)) * 1024 * 1024
+    COVER_CACHE_MAX_AGE = 30 * 24 * 3600  # segundos
+    COVER_MAX_DOWNLOAD = 5 * 1024 * 1024  # 5MB
+    COVER_FALHA_TTL = 3600  # segundos sem tentar de novo uma capa que falhou
+    COVER_TAMANHOS = {'p': 128, 'm': 256, 'g': 512}  # largura máxima em pixels
+    COVER_HOSTS_PERMITIDOS = ('books.google.com', 'books.googleusercontent.com')
+
     # Google Books API
     GOOGLE_BOOKS_API_KEY = os.environ.get('GOOGLE_BOOKS_API_KEY', '')
     GOOGLE_BOOKS_API_URL = 'https://www.googleapis.com/books/v1/volumes'
 
+    # Catálogo local de livros
+    CATALOGO_MIN_RESULTADOS = int(os.environ.get('CATALOGO_MIN_RESULTADOS', 5))  # abaixo disso consulta o Google
+    CATALOGO_TTL = timedelta(days=int(os.environ.get('CATALOGO_TTL_DIAS', 30)))  # entradas mais antigas são atualizadas
+
+    # Histórico de sessões
+    HISTORICO_LIMITE_PADRAO = 50
+    HISTORICO_LIMITE_MAXIMO = 500
+
+    # Arquivamento de mensagens do chat
+    ARQUIVO_MENSAGENS_DIAS = int(os.environ.get('ARQUIVO_MENSAGENS_DIAS', 90))  # idade mínima para arquivar
+    ARQUIVO_LOTE = 1000  # mensagens movidas por transação
+
     # Session
     PERMANENT_SESSION_LIFETIME = timedelta(days=7)
     
@@ -37,3 +58,10 @@ class Config:
         SOCKETIO_MESSAGE_QUEUE = REDIS_URL
     else:
         SOCKETIO_ASYNC_MODE = 'threading'
+
+    # Chat: envio em lotes e limite de mensagens por usuário
+    CHAT_INTERVALO_LOTE = 0.05  # segundos entre lotes
+    CHAT_MAX_EVENTOS_LOTE = 100  # eventos por sala em cada lote; o excesso é adiado
+    CHAT_MAX_FILA_SALA = 1000  # eventos pendentes por sala antes de descartar os mais antigos
+    CHAT_RAJADA_MENSAGENS = 5
+    CHAT_MENSAGENS_POR_SEGUNDO = 1
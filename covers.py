@@ -0,0 +1,162 @@
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+from flask import current_app
+
+from utils import baixar_imagem, gerar_variantes_webp
+
+# Downloads em andamento: chave -> Event, para que acessos simultâneos esperem um único download
+_em_andamento = {}
+_lock = threading.Lock()
+_tamanho_total = None
+
+
+def _pasta_cache():
+    pasta = current_app.config['COVER_CACHE_FOLDER']
+    os.makedirs(pasta, exist_ok=True)
+    return pasta
+
+
+def _chave(entrada):
+    return f'{entrada.id}_{entrada.versao_capa}'
+
+
+def _caminho(chave, tamanho):
+    return os.path.join(_pasta_cache(), f'{chave}_{tamanho}.webp')
+
+
+def _caminho_falha(chave):
+    return os.path.join(_pasta_cache(), f'{chave}.falhou')
+
+
+def _falhou_recentemente(chave):
+    """Indica se o último download desta capa falhou há menos de COVER_FALHA_TTL segundos"""
+    try:
+        idade = time.time() - os.path.getmtime(_caminho_falha(chave))
+    except OSError:
+        return False
+    return idade < current_app.config['COVER_FALHA_TTL']
+
+
+def _registrar_falha(chave):
+    with open(_caminho_falha(chave), 'w'):
+        pass
+
+
+def _usar_cache(caminho):
+    """Marca a capa como usada agora (LRU por mtime); retorna False se ela não existe"""
+    try:
+        os.utime(caminho)
+        return True
+    except OSError:
+        return False
+
+
+def host_permitido(url):
+    """Indica se a capa pode ser baixada ou redirecionada: http(s) em um host conhecido"""
+    partes = urlparse(url or '')
+    if partes.scheme not in ('http', 'https'):
+        return False
+    host = partes.hostname or ''
+    return any(host == h or host.endswith('.' + h)
+               for h in current_app.config['COVER_HOSTS_PERMITIDOS'])
+
+
+def _listar_cache():
+    arquivos = []
+    with os.scandir(_pasta_cache()) as it:
+        for item in it:
+            if item.is_file() and item.name.endswith('.webp'):
+                st = item.stat()
+                arquivos.append((st.st_mtime, st.st_size, item.path))
+    return arquivos
+
+
+def _registrar_bytes(novos):
+    """Soma os bytes gravados e remove as capas menos usadas se o limite for excedido"""
+    global _tamanho_total
+    limite = current_app.config['COVER_CACHE_MAX_BYTES']
+
+    with _lock:
+        if _tamanho_total is None:
+            _tamanho_total = sum(tamanho for _, tamanho, _ in _listar_cache())
+        else:
+            _tamanho_total += novos
+        if _tamanho_total <= limite:
+            return
+
+        # LRU pelo mtime, que é atualizado a cada acerto; libera até 90% do limite
+        arquivos = sorted(_listar_cache())
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        for _, tamanho, caminho in arquivos:
+            if total <= limite * 0.9:
+                break
+            try:
+                os.remove(caminho)
+                total -= tamanho
+            except OSError:
+                pass
+        _tamanho_total = total
+
+
+def _baixar_e_gravar(entrada, chave):
+    if not host_permitido(entrada.capa_url):
+        return False
+
+    conteudo = baixar_imagem(entrada.capa_url, current_app.config['COVER_MAX_DOWNLOAD'])
+    if conteudo is None:
+        return False
+
+    variantes = gerar_variantes_webp(conteudo, current_app.config['COVER_TAMANHOS'])
+    if not variantes:
+        return False
+
+    gravados = 0
+    for tamanho, dados in variantes.items():
+        caminho = _caminho(chave, tamanho)
+        temporario = f'{caminho}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(temporario, 'wb') as f:
+            f.write(dados)
+        os.replace(temporario, caminho)
+        gravados += len(dados)
+
+    _registrar_bytes(gravados)
+    return True
+
+
+def obter_cover(entrada, tamanho):
+    """Retorna o caminho da capa em cache, baixando e redimensionando na primeira vez"""
+    if not entrada.capa_url or tamanho not in current_app.config['COVER_TAMANHOS']:
+        return None
+
+    chave = _chave(entrada)
+    caminho = _caminho(chave, tamanho)
+    if _usar_cache(caminho):
+        return caminho
+    if _falhou_recentemente(chave):
+        return None
+
+    with _lock:
+        # Outro download pode ter terminado entre a verificação acima e o lock
+        if os.path.exists(caminho):
+            return caminho
+        evento = _em_andamento.get(chave)
+        responsavel = evento is None
+        if responsavel:
+            evento = _em_andamento[chave] = threading.Event()
+
+    if not responsavel:
+        evento.wait(timeout=15)
+        return caminho if os.path.exists(caminho) else None
+
+    try:
+        if not _baixar_e_gravar(entrada, chave):
+            _registrar_falha(chave)
+    finally:
+        with _lock:
+            _em_andamento.pop(chave, None)
+        evento.set()
+
+    return caminho if os.path.exists(caminho) else None
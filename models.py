@@ -1,10 +1,34 @@
+import hashlib
+
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import datetime, timedelta
+from sqlalchemy import inspect, text
 from werkzeug.security import generate_password_hash, check_password_hash
 
 db = SQLAlchemy()
 
+# Colunas adicionadas a tabelas que já existiam: (tabela, coluna, DDL)
+COLUNAS_NOVAS = (
+    ('livros', 'catalogo_id', 'INTEGER REFERENCES catalogo_livros (id)'),
+)
+
+
+def atualizar_esquema():
+    """Cria tabelas, colunas e índices que faltam em um banco existente; pode rodar várias vezes"""
+    db.create_all()
+
+    inspetor = inspect(db.engine)
+    with db.engine.begin() as conn:
+        for tabela, coluna, ddl in COLUNAS_NOVAS:
+            if coluna not in {c['name'] for c in inspetor.get_columns(tabela)}:
+                conn.execute(text(f'ALTER TABLE {tabela} ADD COLUMN {coluna} {ddl}'))
+
+    # create_all não cria índices novos em tabelas que já existiam
+    for tabela in db.metadata.sorted_tables:
+        for indice in tabela.indexes:
+            indice.create(db.engine, checkfirst=True)
+
 
 class User(UserMixin, db.Model):
     __tablename__ = 'users'
@@ -71,6 +95,7 @@ class Livro(db.Model):
     total_paginas = db.Column(db.Integer, nullable=False)
     capa_url = db.Column(db.String(500))
     google_books_id = db.Column(db.String(100))
+    catalogo_id = db.Column(db.Integer, db.ForeignKey('catalogo_livros.id'), index=True)
 
     # Status
     status = db.Column(db.String(20), default='lendo')
@@ -108,6 +133,63 @@ class Livro(db.Model):
         return f'<Livro {self.titulo}>'
 
 
+class LivroCatalogo(db.Model):
+    """Metadados compartilhados de um livro, populados a partir das buscas"""
+    __tablename__ = 'catalogo_livros'
+
+    id = db.Column(db.Integer, primary_key=True)
+    google_books_id = db.Column(db.String(100), unique=True, index=True)
+    isbn = db.Column(db.String(20), index=True)
+    titulo = db.Column(db.String(300), nullable=False)
+    autor = db.Column(db.String(200))
+    total_paginas = db.Column(db.Integer, default=0)
+    capa_url = db.Column(db.String(500))
+    descricao = db.Column(db.Text)
+    atualizado_em = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    # Relacionamentos
+    livros = db.relationship('Livro', backref='catalogo', lazy='dynamic')
+    termos = db.relationship('CatalogoTermo', backref='catalogo', lazy='dynamic',
+                             cascade='all, delete-orphan')
+
+    @property
+    def versao_capa(self):
+        """Identifica a capa_url atual; muda quando a capa é trocada"""
+        return hashlib.sha1((self.capa_url or '').encode('utf-8')).hexdigest()[:12]
+
+    def to_dict(self):
+        return {
+            'google_id': self.google_books_id,
+            'titulo': self.titulo,
+            'autor': self.autor,
+            'isbn': self.isbn,
+            'paginas': self.total_paginas or 0,
+            'capa_url': self.capa_url or '',
+            'descricao': self.descricao or ''
+        }
+
+    def __repr__(self):
+        return f'<LivroCatalogo {self.titulo}>'
+
+
+class CatalogoTermo(db.Model):
+    """Índice de prefixos: uma linha por palavra normalizada de título/autor/ISBN"""
+    __tablename__ = 'catalogo_termos'
+
+    id = db.Column(db.Integer, primary_key=True)
+    termo = db.Column(db.String(100), nullable=False)
+    catalogo_id = db.Column(db.Integer, db.ForeignKey('catalogo_livros.id'), nullable=False, index=True)
+
+    # text_pattern_ops permite que o PostgreSQL use o índice em LIKE 'prefixo%'
+    # mesmo com collation de locale
+    __table_args__ = (
+        db.Index('ix_catalogo_termos_termo_prefixo', 'termo', postgresql_ops={'termo': 'text_pattern_ops'}),
+    )
+
+    def __repr__(self):
+        return f'<CatalogoTermo {self.termo}>'
+
+
 class RegistroLeitura(db.Model):
     __tablename__ = 'registros_leitura'
 
@@ -141,11 +223,18 @@ class SessaoLeitura(db.Model):
     pagina_inicial = db.Column(db.Integer)
     pagina_final = db.Column(db.Integer)
 
+    # Paginação do histórico por livro (livro_id, id)
+    __table_args__ = (db.Index('ix_sessoes_leitura_livro_id_id', 'livro_id', 'id'),)
+
+    @staticmethod
+    def calcular_paginas_lidas(pagina_inicial, pagina_final):
+        if pagina_inicial and pagina_final:
+            return pagina_final - pagina_inicial + 1
+        return 0
+
     @property
     def paginas_lidas(self):
-        if self.pagina_inicial and self.pagina_final:
-            return self.pagina_final - self.pagina_inicial + 1
-        return 0
+        return self.calcular_paginas_lidas(self.pagina_inicial, self.pagina_final)
 
     @property
     def duracao_formatada(self):
@@ -169,6 +258,9 @@ class Mensagem(db.Model):
     conteudo = db.Column(db.Text, nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
+    # Ids nunca são reutilizados no SQLite, mesmo depois do arquivamento
+    __table_args__ = {'sqlite_autoincrement': True}
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -183,6 +275,26 @@ class Mensagem(db.Model):
         return f'<Mensagem {self.autor.username}>'
 
 
+class MensagemArquivada(db.Model):
+    """Mensagens antigas movidas de `mensagens` pelo comando arquivar-mensagens
+
+    O conteúdo é guardado sem compressão; o ganho é manter a tabela quente pequena.
+    """
+    __tablename__ = 'mensagens_arquivo'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    conteudo = db.Column(db.Text, nullable=False)
+    timestamp = db.Column(db.DateTime)
+
+    autor = db.relationship('User')
+
+    to_dict = Mensagem.to_dict
+
+    def __repr__(self):
+        return f'<MensagemArquivada {self.autor.username}>'
+
+
 class MensagemPrivada(db.Model):
     __tablename__ = 'mensagens_privadas'
 
@@ -193,6 +305,12 @@ class MensagemPrivada(db.Model):
     lida = db.Column(db.Boolean, default=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
+    # Histórico de uma conversa paginado por id
+    __table_args__ = (
+        db.Index('ix_mensagens_privadas_conversa', 'remetente_id', 'destinatario_id', 'id'),
+        {'sqlite_autoincrement': True}
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -208,3 +326,28 @@ class MensagemPrivada(db.Model):
 
     def __repr__(self):
         return f'<MensagemPrivada {self.remetente.username} -> {self.destinatario.username}>'
+
+
+class MensagemPrivadaArquivada(db.Model):
+    """Mensagens privadas antigas movidas de `mensagens_privadas` pelo comando arquivar-mensagens
+
+    O conteúdo é guardado sem compressão, como em MensagemArquivada.
+    """
+    __tablename__ = 'mensagens_privadas_arquivo'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    remetente_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    destinatario_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    conteudo = db.Column(db.Text, nullable=False)
+    lida = db.Column(db.Boolean, default=False)
+    timestamp = db.Column(db.DateTime)
+
+    remetente = db.relationship('User', foreign_keys=[remetente_id])
+    destinatario = db.relationship('User', foreign_keys=[destinatario_id])
+
+    __table_args__ = (db.Index('ix_mensagens_privadas_arquivo_conversa', 'remetente_id', 'destinatario_id', 'id'),)
+
+    to_dict = MensagemPrivada.to_dict
+
+    def __repr__(self):
+        return f'<MensagemPrivadaArquivada {self.remetente.username} -> {self.destinatario.username}>'
@@ -274,36 +274,57 @@ async function salvarSessaoCrono() {
     }
 }
 
-async function carregarHistoricoSessoes(livroId) {
+async function carregarHistoricoSessoes(livroId, cursor = null) {
     try {
-        const response = await fetch(`/api/historico-sessoes/${livroId}`);
-        const sessoes = await response.json();
+        const url = `/api/historico-sessoes/${livroId}` + (cursor ? `?cursor=${cursor}` : '');
+        const response = await fetch(url);
+        const data = await response.json();
+        const sessoes = data.sessoes;
 
         const container = document.getElementById('lista-sessoes');
 
+        if (cursor) {
+            // Próxima página: acrescenta linhas à tabela existente
+            const tbody = container.querySelector('tbody');
+            sessoes.forEach(s => tbody.insertAdjacentHTML('beforeend', linhaSessao(s)));
+            atualizarBotaoMaisSessoes(livroId, data.proximo_cursor);
+            return;
+        }
+
         if (sessoes.length === 0) {
             container.innerHTML = '<p style="text-align: center; color: #7f8c8d;">Nenhuma sessão registrada ainda.</p>';
             return;
         }
 
-        container.innerHTML = '<table class="sessoes-table"><thead><tr><th>Data/Hora</th><th>Duração</th><th>Páginas</th></tr></thead><tbody>';
-
-        sessoes.forEach(s => {
-            container.innerHTML += `
-                <tr>
-                    <td>${s.inicio}</td>
-                    <td>${s.duracao_minutos} min</td>
-                    <td>${s.pagina_inicial} - ${s.pagina_final} (${s.paginas_lidas} págs)</td>
-                </tr>
-            `;
-        });
-
-        container.innerHTML += '</tbody></table>';
+        container.innerHTML = '<table class="sessoes-table"><thead><tr><th>Data/Hora</th><th>Duração</th><th>Páginas</th></tr></thead><tbody>'
+            + sessoes.map(linhaSessao).join('')
+            + '</tbody></table>';
+        atualizarBotaoMaisSessoes(livroId, data.proximo_cursor);
     } catch (error) {
         console.error('Erro ao carregar sessões:', error);
     }
 }
 
+function linhaSessao(s) {
+    return `
+        <tr>
+            <td>${s.inicio}</td>
+            <td>${s.duracao_minutos} min</td>
+            <td>${s.pagina_inicial} - ${s.pagina_final} (${s.paginas_lidas} págs)</td>
+        </tr>
+    `;
+}
+
+function atualizarBotaoMaisSessoes(livroId, proximoCursor) {
+    const container = document.getElementById('lista-sessoes');
+    const botao = container.querySelector('.btn-mais-sessoes');
+    if (botao) botao.remove();
+    if (!proximoCursor) return;
+
+    container.insertAdjacentHTML('beforeend',
+        `<button class="btn-small btn-mais-sessoes" onclick="carregarHistoricoSessoes(${livroId}, ${proximoCursor})">Carregar mais</button>`);
+}
+
 // ============= MODAIS E HISTÓRICO =============
 function verHistorico(livroId) {
     // Implementar modal com histórico de registros
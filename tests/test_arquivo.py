@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from arquivo import arquivar_mensagens, mensagens_anteriores, mensagens_privadas_anteriores
+from models import db, Mensagem, MensagemArquivada, MensagemPrivada
+from tests.conftest import criar_usuario
+
+
+def _mensagens(usuario, quantidade, dias_atras):
+    for i in range(quantidade):
+        db.session.add(Mensagem(usuario_id=usuario.id, conteudo=f'm{dias_atras}-{i}',
+                                timestamp=datetime.utcnow() - timedelta(days=dias_atras, minutes=quantidade - i)))
+    db.session.commit()
+
+
+def _todas(limite):
+    cursor, todas = None, []
+    while True:
+        mensagens, cursor = mensagens_anteriores(cursor, limite)
+        todas = [m.conteudo for m in mensagens] + todas
+        if not cursor:
+            return todas
+
+
+def test_paginacao_atravessa_quente_e_arquivo(app, usuario):
+    _mensagens(usuario, 30, 200)
+    _mensagens(usuario, 10, 1)
+
+    assert arquivar_mensagens(90, lote=7)['mensagens'] == 30
+    assert Mensagem.query.count() == 10
+
+    todas = _todas(8)
+    assert len(todas) == 40
+    assert todas[0] == 'm200-0' and todas[-1] == 'm1-9'
+
+
+def _recriar_mensagens_sem_autoincrement():
+    # Esquema antigo: INTEGER PRIMARY KEY sem AUTOINCREMENT reaproveita ids
+    with db.engine.begin() as conn:
+        conn.execute(text('DROP TABLE mensagens'))
+        conn.execute(text(
+            'CREATE TABLE mensagens (id INTEGER PRIMARY KEY, usuario_id INTEGER NOT NULL, '
+            'conteudo TEXT NOT NULL, timestamp DATETIME)'
+        ))
+
+
+@pytest.mark.parametrize('tabela_antiga', [False, True])
+def test_ids_novos_ficam_acima_dos_arquivados(app, usuario, tabela_antiga):
+    if tabela_antiga:
+        _recriar_mensagens_sem_autoincrement()
+
+    _mensagens(usuario, 3, 200)
+    arquivar_mensagens(90)
+    _mensagens(usuario, 2, 0)
+
+    maior_arquivado = db.session.query(db.func.max(MensagemArquivada.id)).scalar()
+    assert min(m.id for m in Mensagem.query.all()) > maior_arquivado
+    assert len(_todas(2)) == 5
+
+    # Arquivar de novo não colide com ids já arquivados
+    arquivar_mensagens(0)
+    assert MensagemArquivada.query.count() == 4
+
+
+def test_historico_privado_retorna_as_mais_recentes(app, usuario):
+    outro = criar_usuario('outro', 'outro@example.com')
+    for i in range(60):
+        db.session.add(MensagemPrivada(remetente_id=usuario.id, destinatario_id=outro.id, conteudo=f'p{i}'))
+    db.session.commit()
+
+    mensagens, cursor = mensagens_privadas_anteriores(outro.id, usuario.id, limite=50)
+
+    assert [m.conteudo for m in mensagens][0] == 'p10'
+    assert mensagens[-1].conteudo == 'p59'
+    assert cursor == mensagens[0].id
@@ -0,0 +1,123 @@
+import catalogo
+from models import Livro, LivroCatalogo
+
+
+def _volume(google_id, titulo='Dom Casmurro', isbn='9788535910663'):
+    return {
+        'google_id': google_id,
+        'titulo': titulo,
+        'autor': 'Machado de Assis',
+        'isbn': isbn,
+        'paginas': 256,
+        'capa_url': 'http://books.google.com/capa.jpg',
+        'descricao': ''
+    }
+
+
+def test_adicionar_livro_nao_grava_corpo_da_requisicao_no_catalogo(client, monkeypatch):
+    monkeypatch.setattr(catalogo, 'buscar_volume_google', lambda google_id: None)
+
+    r = client.post('/api/adicionar-livro', json={
+        'titulo': '<img src=x onerror=alert(1)>', 'paginas': 100, 'google_id': 'fake1'
+    })
+
+    assert r.status_code == 200
+    assert LivroCatalogo.query.count() == 0
+    assert Livro.query.one().catalogo_id is None
+
+
+def test_adicionar_livro_usa_dados_do_google_no_catalogo(client, monkeypatch):
+    monkeypatch.setattr(catalogo, 'buscar_volume_google', lambda google_id: _volume(google_id))
+
+    r = client.post('/api/adicionar-livro', json={
+        'titulo': 'Título editado', 'paginas': 100, 'google_id': 'g1'
+    })
+
+    assert r.status_code == 200
+    entrada = LivroCatalogo.query.one()
+    assert entrada.titulo == 'Dom Casmurro'
+    assert Livro.query.one().catalogo_id == entrada.id
+
+
+def test_busca_local_por_prefixo_sem_acento(client, monkeypatch):
+    chamadas = []
+
+    def google(query):
+        chamadas.append(query)
+        return [_volume(f'g{i}', f'Memórias Póstumas {i}', f'97800000000{i}') for i in range(6)]
+
+    monkeypatch.setattr(catalogo, 'buscar_livros_google', google)
+
+    assert len(client.get('/api/buscar-livros?q=memorias').json) == 6
+    assert len(client.get('/api/buscar-livros?q=POST mach').json) == 6
+    assert chamadas == ['memorias']
+
+
+def test_salvar_no_catalogo_ignora_tipos_inesperados(app):
+    catalogo.salvar_no_catalogo([{'google_id': 'g1', 'titulo': 5, 'autor': 5, 'isbn': 7, 'paginas': 'x'}])
+
+    entrada = LivroCatalogo.query.one()
+    assert entrada.titulo == 'Sem título'
+    assert entrada.autor == ''
+    assert entrada.total_paginas == 0
+
+
+def test_salvar_no_catalogo_trata_insercao_concorrente(app, monkeypatch):
+    catalogo.salvar_no_catalogo([_volume('g1', 'Primeira versão')])
+
+    # Simula uma requisição que não viu a entrada recém-inserida pela outra
+    original = catalogo._localizar_entrada
+    chamadas = []
+
+    def localizar(*args, **kwargs):
+        chamadas.append(args)
+        return None if len(chamadas) == 1 else original(*args, **kwargs)
+
+    monkeypatch.setattr(catalogo, '_localizar_entrada', localizar)
+    catalogo.salvar_no_catalogo([_volume('g1', 'Segunda versão')])
+
+    assert LivroCatalogo.query.one().titulo == 'Segunda versão'
+
+
+def test_adicionar_livro_com_autor_nao_textual(client, monkeypatch):
+    monkeypatch.setattr(catalogo, 'buscar_volume_google', lambda google_id: dict(_volume(google_id), autor=5))
+
+    r = client.post('/api/adicionar-livro', json={'titulo': 'X', 'autor': 5, 'paginas': 10, 'google_id': 'g1'})
+
+    assert r.status_code == 200
+    assert LivroCatalogo.query.one().autor == ''
+
+
+def test_volumes_com_mesmo_isbn_na_mesma_busca_ficam_separados(app):
+    catalogo.salvar_no_catalogo([_volume('g1', 'Edição A'), _volume('g2', 'Edição B')])
+
+    entradas = {e.google_books_id: e.titulo for e in LivroCatalogo.query.all()}
+    assert entradas == {'g1': 'Edição A', 'g2': 'Edição B'}
+
+
+def test_adicionar_volume_com_isbn_ja_catalogado(client, monkeypatch):
+    catalogo.salvar_no_catalogo([_volume('g1', 'Edição A')])
+    chamadas = []
+
+    def volume(google_id):
+        chamadas.append(google_id)
+        return _volume(google_id, 'Edição B')
+
+    monkeypatch.setattr(catalogo, 'buscar_volume_google', volume)
+
+    for _ in range(2):
+        r = client.post('/api/adicionar-livro', json={'titulo': 'B', 'paginas': 10, 'google_id': 'g2'})
+        assert r.status_code == 200
+
+    g1 = LivroCatalogo.query.filter_by(google_books_id='g1').one()
+    g2 = LivroCatalogo.query.filter_by(google_books_id='g2').one()
+    assert g1.titulo == 'Edição A'
+    assert [livro.catalogo_id for livro in Livro.query.all()] == [g2.id, g2.id]
+    assert chamadas == ['g2']
+
+
+def test_busca_por_prefixo_trata_sublinhado_como_literal(app):
+    catalogo.salvar_no_catalogo([_volume('g1', 'abc', '1'), _volume('g2', 'a_c', '2')])
+
+    assert [e.google_books_id for e in catalogo.buscar_no_catalogo('a_')] == ['g2']
+    assert {e.google_books_id for e in catalogo.buscar_no_catalogo('mach')} == {'g1', 'g2'}
@@ -0,0 +1,179 @@
+import io
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from PIL import Image
+
+import covers
+from models import db, Livro, LivroCatalogo
+from tests.conftest import logar
+
+
+def _jpeg():
+    buf = io.BytesIO()
+    Image.new('RGB', (600, 900), 'red').save(buf, 'JPEG')
+    return buf.getvalue()
+
+
+class ServidorCapas:
+    """Servidor HTTP local que serve a mesma capa JPEG e conta os acessos"""
+
+    def __init__(self):
+        self.acessos = 0
+        self.atraso = 0
+        imagem = _jpeg()
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                servidor.acessos += 1
+                time.sleep(servidor.atraso)
+                if 'quebrada' in self.path:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'image/jpeg')
+                self.send_header('Content-Length', str(len(imagem)))
+                self.end_headers()
+                self.wfile.write(imagem)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def url(self, caminho):
+        return f'http://127.0.0.1:{self.httpd.server_port}/{caminho}'
+
+
+@pytest.fixture
+def servidor(app, monkeypatch):
+    monkeypatch.setitem(app.config, 'COVER_HOSTS_PERMITIDOS', ('127.0.0.1',))
+    monkeypatch.setattr(covers, '_tamanho_total', None)
+    servidor = ServidorCapas()
+    yield servidor
+    servidor.httpd.shutdown()
+
+
+def _entrada(capa_url):
+    entrada = LivroCatalogo(titulo='Capa', capa_url=capa_url)
+    db.session.add(entrada)
+    db.session.commit()
+    return entrada
+
+
+def _arquivos(app):
+    return sorted(os.listdir(app.config['COVER_CACHE_FOLDER']))
+
+
+def test_cover_nao_redireciona_para_host_desconhecido(client):
+    entrada = _entrada('https://evil.example/x')
+
+    r = client.get(f'/covers/{entrada.id}')
+
+    assert r.status_code == 404
+    assert 'Location' not in r.headers
+
+
+def test_primeiro_acesso_baixa_e_gera_variantes(app, client, servidor):
+    entrada = _entrada(servidor.url('a.jpg'))
+
+    r = client.get(f'/covers/{entrada.id}?tamanho=p')
+
+    assert r.status_code == 200
+    assert r.mimetype == 'image/webp'
+    assert f"max-age={app.config['COVER_CACHE_MAX_AGE']}" in r.headers['Cache-Control']
+    assert Image.open(io.BytesIO(r.data)).width == app.config['COVER_TAMANHOS']['p']
+    assert servidor.acessos == 1
+    assert len(_arquivos(app)) == len(app.config['COVER_TAMANHOS'])
+
+
+def test_acerto_no_cache_nao_acessa_o_servidor(client, servidor):
+    entrada = _entrada(servidor.url('a.jpg'))
+
+    client.get(f'/covers/{entrada.id}?tamanho=p')
+    r_m = client.get(f'/covers/{entrada.id}?tamanho=m')
+    r_g = client.get(f'/covers/{entrada.id}?tamanho=g')
+
+    assert r_m.status_code == r_g.status_code == 200
+    assert servidor.acessos == 1
+
+
+def test_acessos_simultaneos_fazem_um_unico_download(app, usuario, servidor):
+    servidor.atraso = 0.3
+    url = f"/covers/{_entrada(servidor.url('a.jpg')).id}"
+    clientes = [logar(app) for _ in range(8)]
+    status = []
+
+    def acessar(cliente):
+        status.append(cliente.get(url).status_code)
+
+    threads = [threading.Thread(target=acessar, args=(cliente,)) for cliente in clientes]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert status == [200] * 8
+    assert servidor.acessos == 1
+
+
+def test_limite_do_cache_remove_as_capas_menos_usadas(app, servidor):
+    a, b, c = (_entrada(servidor.url(f'{nome}.jpg')) for nome in 'abc')
+
+    covers.obter_cover(a, 'm')
+    tamanho_por_capa = sum(os.path.getsize(os.path.join(app.config['COVER_CACHE_FOLDER'], f))
+                           for f in _arquivos(app))
+    covers.obter_cover(b, 'm')
+
+    # b foi usada há mais tempo que a
+    agora = time.time()
+    for nome in _arquivos(app):
+        caminho = os.path.join(app.config['COVER_CACHE_FOLDER'], nome)
+        antigo = nome.startswith(f'{b.id}_')
+        os.utime(caminho, (agora - 100 if antigo else agora - 10,) * 2)
+
+    app.config['COVER_CACHE_MAX_BYTES'] = int(tamanho_por_capa * 2.5)
+    covers.obter_cover(c, 'm')
+
+    prefixos = {nome.split('_')[0] for nome in _arquivos(app)}
+    assert prefixos == {str(a.id), str(c.id)}
+
+
+def test_falha_no_download_nao_e_repetida_a_cada_acesso(app, client, servidor):
+    entrada = _entrada(servidor.url('quebrada.jpg'))
+
+    respostas = [client.get(f'/covers/{entrada.id}') for _ in range(3)]
+
+    assert [r.status_code for r in respostas] == [302] * 3
+    assert servidor.acessos == 1
+
+
+def test_falha_expirada_tenta_de_novo(app, servidor, monkeypatch):
+    entrada = _entrada(servidor.url('quebrada.jpg'))
+    covers.obter_cover(entrada, 'm')
+
+    monkeypatch.setitem(app.config, 'COVER_FALHA_TTL', 0)
+    covers.obter_cover(entrada, 'm')
+
+    assert servidor.acessos == 2
+
+
+def test_url_da_capa_muda_quando_a_capa_e_trocada(app, client, usuario):
+    entrada = _entrada('https://books.google.com/capa1.jpg')
+    db.session.add(Livro(titulo='Capa', total_paginas=10, usuario_id=usuario.id,
+                         capa_url=entrada.capa_url, catalogo_id=entrada.id))
+    db.session.commit()
+    antiga = f'/covers/{entrada.id}?v={entrada.versao_capa}'
+    assert antiga in client.get('/dashboard').get_data(as_text=True)
+
+    entrada.capa_url = 'https://books.google.com/capa2.jpg'
+    db.session.commit()
+    html = client.get('/dashboard').get_data(as_text=True)
+
+    assert antiga not in html
+    assert f'/covers/{entrada.id}?v={entrada.versao_capa}' in html
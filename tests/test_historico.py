@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from models import db, Livro, SessaoLeitura
+
+
+@pytest.fixture
+def livro(usuario):
+    livro = Livro(titulo='Longo', total_paginas=1000, usuario_id=usuario.id)
+    db.session.add(livro)
+    db.session.commit()
+
+    inicio = datetime(2024, 1, 1)
+    for i in range(5):
+        db.session.add(SessaoLeitura(livro_id=livro.id, usuario_id=usuario.id,
+                                     inicio=inicio + timedelta(days=i), fim=inicio + timedelta(days=i, minutes=30),
+                                     duracao_minutos=30, pagina_inicial=i * 10 + 1, pagina_final=i * 10 + 10))
+    # Sessão em andamento não aparece no histórico
+    db.session.add(SessaoLeitura(livro_id=livro.id, usuario_id=usuario.id, inicio=inicio, pagina_inicial=1))
+    db.session.commit()
+    return livro
+
+
+@pytest.mark.parametrize('query', ['cursor=abc', 'limite=abc', 'cursor='])
+def test_parametros_invalidos_retornam_400(client, livro, query):
+    r = client.get(f'/api/historico-sessoes/{livro.id}?{query}')
+
+    assert r.status_code == 400
+
+
+def test_paginacao_por_cursor(client, livro):
+    primeira = client.get(f'/api/historico-sessoes/{livro.id}?limite=3').json
+    segunda = client.get(f"/api/historico-sessoes/{livro.id}?limite=3&cursor={primeira['proximo_cursor']}").json
+
+    assert [s['pagina_inicial'] for s in primeira['sessoes']] == [41, 31, 21]
+    assert [s['pagina_inicial'] for s in segunda['sessoes']] == [11, 1]
+    assert segunda['proximo_cursor'] is None
+    assert primeira['sessoes'][0]['paginas_lidas'] == 10
+    assert primeira['sessoes'][0]['inicio'] == '05/01/2024 00:00'
+
+
+def test_formato_colunas(client, livro):
+    r = client.get(f'/api/historico-sessoes/{livro.id}?limite=2&formato=colunas')
+
+    colunas = r.json['colunas']
+    assert colunas['inicio'] == [1704412800, 1704326400]
+    assert colunas['paginas_lidas'] == [10, 10]
+    assert colunas['pagina_final'] == [50, 40]
+    assert r.json['proximo_cursor'] == colunas['id'][-1]
@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Orçamento de importação de `app`, em microssegundos; sobrescreva com IMPORT_BUDGET_MS
+ORCAMENTO_US = int(os.environ.get('IMPORT_BUDGET_MS', 1500)) * 1000
+
+
+# Carregados sob demanda: PIL ao gerar capas, psycopg2 ao conectar no PostgreSQL
+NAO_CARREGADOS = ('PIL', 'psycopg2')
+
+
+def _importar_app():
+    codigo = "import sys, app; print(','.join(m for m in sys.modules if '.' not in m))"
+    resultado = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', codigo],
+        cwd=RAIZ, capture_output=True, text=True, check=True
+    )
+    # Linhas no formato "import time: self | cumulative | módulo"
+    tempos = {}
+    arvore = []
+    for linha in resultado.stderr.splitlines():
+        if linha.startswith('import time:') and '|' in linha:
+            _, cumulativo, modulo = linha[len('import time:'):].split('|')
+            if cumulativo.strip().isdigit():
+                tempos[modulo.strip()] = int(cumulativo)
+                arvore.append((len(modulo) - len(modulo.lstrip()), modulo.strip()))
+    return tempos, arvore, resultado.stdout.strip().split(',')
+
+
+def _importado_por(arvore, modulo):
+    """Cadeia de módulos que levou à primeira importação de `modulo`
+
+    O -X importtime imprime cada módulo depois dos que ele importou, então o
+    pai é a próxima linha com indentação menor.
+    """
+    nomes = [nome for _, nome in arvore]
+    i = nomes.index(modulo)
+    nivel = arvore[i][0]
+    cadeia = []
+    for nivel_pai, nome in arvore[i + 1:]:
+        if nivel_pai < nivel:
+            cadeia.append(nome)
+            nivel = nivel_pai
+    return cadeia
+
+
+def test_importar_app_nao_carrega_dependencias_pesadas():
+    _, _, carregados = _importar_app()
+
+    for modulo in NAO_CARREGADOS:
+        assert modulo not in carregados, f'{modulo} é carregado ao importar app'
+
+
+def test_requests_so_e_carregado_pelo_flask_socketio():
+    # Exceção conhecida: engineio.client importa requests e é carregado pelo
+    # flask_socketio; o código da aplicação só importa requests sob demanda
+    _, arvore, carregados = _importar_app()
+
+    assert 'requests' in carregados
+    assert 'engineio.client' in _importado_por(arvore, 'requests')
+
+
+def test_importar_app_dentro_do_orcamento():
+    # Primeira execução compila os .pyc; mede a segunda
+    _importar_app()
+    tempos, _, _ = _importar_app()
+
+    assert 'app' in tempos
+    assert tempos['app'] <= ORCAMENTO_US, f"import app levou {tempos['app'] / 1000:.0f}ms"
+
+
+def test_app_importa_sem_requests():
+    # Bloqueia requests depois do flask_socketio: qualquer import no nível do
+    # módulo em app, utils, catalogo ou covers falha com ImportError
+    codigo = "import sys, flask_socketio; sys.modules['requests'] = None; import app"
+    resultado = subprocess.run([sys.executable, '-c', codigo], cwd=RAIZ, capture_output=True, text=True)
+
+    assert resultado.returncode == 0, resultado.stderr
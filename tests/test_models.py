@@ -0,0 +1,23 @@
+from sqlalchemy import inspect, text
+
+from models import db, atualizar_esquema, Livro
+
+
+def test_atualizar_esquema_adiciona_catalogo_id_em_banco_antigo(app, usuario):
+    # Tabela livros como era antes do catálogo compartilhado
+    with db.engine.begin() as conn:
+        conn.execute(text('DROP TABLE livros'))
+        conn.execute(text(
+            'CREATE TABLE livros (id INTEGER PRIMARY KEY, titulo VARCHAR(300) NOT NULL, '
+            'autor VARCHAR(200), isbn VARCHAR(20), total_paginas INTEGER NOT NULL, '
+            'capa_url VARCHAR(500), google_books_id VARCHAR(100), status VARCHAR(20), '
+            'pagina_atual INTEGER, usuario_id INTEGER NOT NULL, created_at DATETIME, '
+            'iniciado_em DATETIME, concluido_em DATETIME)'
+        ))
+        conn.execute(text(f"INSERT INTO livros (titulo, total_paginas, usuario_id) VALUES ('Antigo', 10, {usuario.id})"))
+
+    atualizar_esquema()
+    atualizar_esquema()
+
+    assert 'catalogo_id' in {c['name'] for c in inspect(db.engine).get_columns('livros')}
+    assert Livro.query.one().catalogo_id is None
@@ -0,0 +1,72 @@
+from transmissao import AgendadorTransmissao, BaldeTokens, LimitadorMensagens
+
+
+class SocketIOFalso:
+    def __init__(self):
+        self.emitidos = []
+
+    def emit(self, evento, dados, to=None):
+        self.emitidos.append((evento, dados, to))
+
+    def start_background_task(self, alvo):
+        # Os testes chamam despachar() diretamente
+        return object()
+
+
+def test_lote_agrupa_eventos_por_sala():
+    socketio = SocketIOFalso()
+    agendador = AgendadorTransmissao(socketio)
+
+    agendador.enfileirar('nova_mensagem', {'id': 1})
+    agendador.enfileirar('nova_mensagem', {'id': 2})
+    agendador.enfileirar('nova_mensagem_privada', {'id': 3}, room='chat_1_2')
+    agendador.despachar()
+
+    assert sorted(socketio.emitidos, key=lambda e: str(e[2])) == [
+        ('lote', [{'evento': 'nova_mensagem', 'dados': {'id': 1}},
+                  {'evento': 'nova_mensagem', 'dados': {'id': 2}}], None),
+        ('lote', [{'evento': 'nova_mensagem_privada', 'dados': {'id': 3}}], 'chat_1_2'),
+    ]
+
+
+def test_adiados_conta_cada_evento_uma_vez():
+    agendador = AgendadorTransmissao(SocketIOFalso(), max_por_lote=100)
+
+    for i in range(250):
+        agendador.enfileirar('nova_mensagem', {'id': i})
+    while agendador.despachar():
+        pass
+
+    stats = agendador.estatisticas()
+    assert stats['enviados'] == 250
+    assert stats['adiados'] == 150
+    assert stats['pendentes'] == 0
+
+
+def test_fila_cheia_descarta_os_mais_antigos():
+    socketio = SocketIOFalso()
+    agendador = AgendadorTransmissao(socketio, max_fila=3)
+
+    for i in range(5):
+        agendador.enfileirar('nova_mensagem', {'id': i})
+    agendador.despachar()
+
+    assert [e['dados']['id'] for e in socketio.emitidos[0][1]] == [2, 3, 4]
+    assert agendador.estatisticas()['descartados'] == 2
+
+
+def test_balde_permite_rajada_e_repoe_tokens():
+    balde = BaldeTokens(capacidade=2, taxa=1)
+    t = balde.atualizado
+
+    assert [balde.consumir(t), balde.consumir(t), balde.consumir(t)] == [True, True, False]
+    assert balde.consumir(t + 1) is True
+    assert balde.consumir(t + 1) is False
+
+
+def test_limitador_e_por_usuario():
+    limitador = LimitadorMensagens(capacidade=1, taxa=0.001)
+
+    assert limitador.permitir(1) is True
+    assert limitador.permitir(1) is False
+    assert limitador.permitir(2) is True
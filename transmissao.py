@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import deque
+
+
+class BaldeTokens:
+    """Token bucket: permite rajadas de até `capacidade` e repõe `taxa` tokens por segundo"""
+
+    def __init__(self, capacidade, taxa):
+        self.capacidade = capacidade
+        self.taxa = taxa
+        self.tokens = float(capacidade)
+        self.atualizado = time.monotonic()
+
+    def consumir(self, agora=None):
+        agora = time.monotonic() if agora is None else agora
+        decorrido = max(0.0, agora - self.atualizado)
+        self.tokens = min(self.capacidade, self.tokens + decorrido * self.taxa)
+        self.atualizado = max(self.atualizado, agora)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class LimitadorMensagens:
+    """Limita a taxa de envio de mensagens por usuário"""
+
+    def __init__(self, capacidade=5, taxa=1):
+        self.capacidade = capacidade
+        self.taxa = taxa
+        self._baldes = {}
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.capacidade = app.config['CHAT_RAJADA_MENSAGENS']
+        self.taxa = app.config['CHAT_MENSAGENS_POR_SEGUNDO']
+
+    def permitir(self, usuario_id):
+        agora = time.monotonic()
+        with self._lock:
+            balde = self._baldes.get(usuario_id)
+            if balde is None:
+                if len(self._baldes) > 10000:
+                    self._remover_inativos(agora)
+                balde = self._baldes[usuario_id] = BaldeTokens(self.capacidade, self.taxa)
+            return balde.consumir(agora)
+
+    def _remover_inativos(self, agora):
+        # Um balde cheio de novo é equivalente a um balde novo
+        cheio_apos = self.capacidade / self.taxa
+        for usuario_id, balde in list(self._baldes.items()):
+            if agora - balde.atualizado > cheio_apos:
+                del self._baldes[usuario_id]
+
+
+class AgendadorTransmissao:
+    """Agrupa os eventos de saída por sala e os envia em lotes a cada `intervalo` segundos
+
+    Cada lote é emitido como um único evento 'lote' contendo uma lista de
+    {'evento': nome, 'dados': payload}. Sala None significa broadcast.
+    """
+
+    def __init__(self, socketio, intervalo=0.05, max_por_lote=100, max_fila=1000):
+        self.socketio = socketio
+        self.intervalo = intervalo
+        self.max_por_lote = max_por_lote
+        self.max_fila = max_fila
+        self._filas = {}
+        # Eventos no início de cada fila que já foram contados como adiados
+        self._ja_adiados = {}
+        self._lock = threading.Lock()
+        self._tarefa = None
+        self._stats = {'enfileirados': 0, 'enviados': 0, 'lotes': 0,
+                       'descartados': 0, 'adiados': 0, 'limitados': 0}
+
+    def init_app(self, app):
+        self.intervalo = app.config['CHAT_INTERVALO_LOTE']
+        self.max_por_lote = app.config['CHAT_MAX_EVENTOS_LOTE']
+        self.max_fila = app.config['CHAT_MAX_FILA_SALA']
+
+    def enfileirar(self, evento, dados, room=None):
+        with self._lock:
+            fila = self._filas.get(room)
+            if fila is None:
+                fila = self._filas[room] = deque()
+            if len(fila) >= self.max_fila:
+                # Fila cheia: descarta o evento mais antigo da sala
+                fila.popleft()
+                self._stats['descartados'] += 1
+                if self._ja_adiados.get(room):
+                    self._ja_adiados[room] -= 1
+            fila.append({'evento': evento, 'dados': dados})
+            self._stats['enfileirados'] += 1
+
+            if self._tarefa is None:
+                self._tarefa = self.socketio.start_background_task(self._executar)
+
+    def registrar_limitado(self):
+        with self._lock:
+            self._stats['limitados'] += 1
+
+    def despachar(self):
+        """Envia um lote por sala com até `max_por_lote` eventos; o restante fica para o próximo"""
+        lotes = []
+        with self._lock:
+            for room, fila in list(self._filas.items()):
+                n = min(len(fila), self.max_por_lote)
+                lotes.append((room, [fila.popleft() for _ in range(n)]))
+                if fila:
+                    # Conta cada evento adiado uma única vez, mesmo que espere vários lotes
+                    ja_adiados = max(0, self._ja_adiados.get(room, 0) - n)
+                    self._stats['adiados'] += len(fila) - ja_adiados
+                    self._ja_adiados[room] = len(fila)
+                else:
+                    del self._filas[room]
+                    self._ja_adiados.pop(room, None)
+            self._stats['lotes'] += len(lotes)
+            self._stats['enviados'] += sum(len(eventos) for _, eventos in lotes)
+
+        for room, eventos in lotes:
+            self.socketio.emit('lote', eventos, to=room)
+        return len(lotes)
+
+    def _executar(self):
+        while True:
+            self.socketio.sleep(self.intervalo)
+            try:
+                self.despachar()
+            except Exception as e:
+                print(f"Erro ao despachar lote: {e}")
+
+    def estatisticas(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['pendentes'] = sum(len(fila) for fila in self._filas.values())
+        return stats
@@ -1,9 +1,25 @@
 import os
-import requests
+import json
+from io import BytesIO
 from werkzeug.utils import secure_filename
-from PIL import Image
 from flask import current_app
 
+# PIL e requests são importados dentro das funções que os usam, para não pesar na inicialização
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional; usa o json da stdlib
+    orjson = None
+
+
+def resposta_json(dados, status=200):
+    """Serializa a resposta com orjson quando disponível, mais rápido que o jsonify"""
+    if orjson is not None:
+        corpo = orjson.dumps(dados)
+    else:
+        corpo = json.dumps(dados, separators=(',', ':'), ensure_ascii=False)
+    return current_app.response_class(corpo, status=status, mimetype='application/json')
+
 
 def allowed_file(filename):
     """Verifica se a extensão do arquivo é permitida"""
@@ -30,6 +46,8 @@ def save_upload_image(file, tipo='perfil'):
     filepath = os.path.join(upload_dir, unique_filename)
 
     try:
+        from PIL import Image
+
         # Redimensionar imagem
         file.stream.seek(0)
         img = Image.open(file.stream)
@@ -47,8 +65,73 @@ def save_upload_image(file, tipo='perfil'):
         return None
 
 
+def baixar_imagem(url, max_bytes):
+    """Baixa uma imagem remota respeitando um tamanho máximo"""
+    import requests
+
+    try:
+        with requests.get(url, timeout=10, stream=True) as response:
+            response.raise_for_status()
+            conteudo = bytearray()
+            for bloco in response.iter_content(64 * 1024):
+                conteudo += bloco
+                if len(conteudo) > max_bytes:
+                    print(f"Imagem muito grande: {url}")
+                    return None
+            return bytes(conteudo)
+    except Exception as e:
+        print(f"Erro ao baixar imagem: {e}")
+        return None
+
+
+def gerar_variantes_webp(conteudo, larguras):
+    """Gera versões WebP redimensionadas de uma imagem, uma por largura"""
+    from PIL import Image
+
+    try:
+        img = Image.open(BytesIO(conteudo))
+        img = img.convert('RGBA' if img.mode in ('RGBA', 'LA', 'P') else 'RGB')
+    except Exception as e:
+        print(f"Erro ao processar imagem: {e}")
+        return {}
+
+    variantes = {}
+    for nome, largura in larguras.items():
+        copia = img.copy()
+        copia.thumbnail((largura, largura * 2))
+        saida = BytesIO()
+        copia.save(saida, 'WEBP', quality=80, method=4)
+        variantes[nome] = saida.getvalue()
+    return variantes
+
+
+def _converter_volume(item):
+    """Converte um volume da API do Google Books no formato usado pela aplicação"""
+    volume_info = item.get('volumeInfo', {})
+
+    livro = {
+        'google_id': item.get('id'),
+        'titulo': volume_info.get('title', 'Sem título'),
+        'autor': ', '.join(volume_info.get('authors', [])) or 'Autor desconhecido',
+        'isbn': None,
+        'paginas': volume_info.get('pageCount', 0),
+        'capa_url': volume_info.get('imageLinks', {}).get('thumbnail', ''),
+        'descricao': volume_info.get('description', '')
+    }
+
+    # Buscar ISBN
+    for identifier in volume_info.get('industryIdentifiers', []):
+        if identifier['type'] in ['ISBN_13', 'ISBN_10']:
+            livro['isbn'] = identifier['identifier']
+            break
+
+    return livro
+
+
 def buscar_livros_google(query):
     """Busca livros na API do Google Books"""
+    import requests
+
     try:
         api_key = current_app.config.get('GOOGLE_BOOKS_API_KEY', '')
         url = current_app.config['GOOGLE_BOOKS_API_URL']
@@ -66,31 +149,28 @@ def buscar_livros_google(query):
         response.raise_for_status()
 
         data = response.json()
-        livros = []
+        return [_converter_volume(item) for item in data.get('items', [])]
+
+    except Exception as e:
+        print(f"Erro ao buscar livros: {e}")
+        return []
 
-        for item in data.get('items', []):
-            volume_info = item.get('volumeInfo', {})
 
-            livro = {
-                'google_id': item.get('id'),
-                'titulo': volume_info.get('title', 'Sem título'),
-                'autor': ', '.join(volume_info.get('authors', [])) or 'Autor desconhecido',
-                'isbn': None,
-                'paginas': volume_info.get('pageCount', 0),
-                'capa_url': volume_info.get('imageLinks', {}).get('thumbnail', ''),
-                'descricao': volume_info.get('description', '')
-            }
+def buscar_volume_google(google_id):
+    """Busca um único volume na API do Google Books pelo id"""
+    import requests
 
-            # Buscar ISBN
-            for identifier in volume_info.get('industryIdentifiers', []):
-                if identifier['type'] in ['ISBN_13', 'ISBN_10']:
-                    livro['isbn'] = identifier['identifier']
-                    break
+    try:
+        api_key = current_app.config.get('GOOGLE_BOOKS_API_KEY', '')
+        url = f"{current_app.config['GOOGLE_BOOKS_API_URL']}/{google_id}"
 
-            livros.append(livro)
+        params = {'key': api_key} if api_key else {}
 
-        return livros
+        response = requests.get(url, params=params, timeout=10)
+        response.raise_for_status()
+
+        return _converter_volume(response.json())
 
     except Exception as e:
-        print(f"Erro ao buscar livros: {e}")
-        return []
+        print(f"Erro ao buscar volume {google_id}: {e}")
+        return None